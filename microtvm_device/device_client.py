@@ -16,106 +16,378 @@
 # under the License.
 
 import pathlib
-import grpc
 import logging
 import argparse
 import time
 import getpass
+import random
+import os
+import threading
+import tempfile
 
-from . import microDevice_pb2_grpc
-from . import microDevice_pb2
-from .device_utils import MicroDevice
+from .device_utils import MicroDevice, MicroTVMPlatforms
 from .device_utils import GRPCSessionTasks
 from . import device_utils
-from .utils import SERVER_DEFAULT_IP
+from .utils import SERVER_DEFAULT_IP, GRPC_KEEPALIVE_OPTIONS
 
 LOG_ = logging.getLogger("MicroTVM Device Client")
 
+# grpc and generated protobuf modules are imported on first use by _import_grpc() to keep
+# CLI startup (e.g. --help) fast.
+grpc = None
+microDevice_pb2 = None
+microDevice_pb2_grpc = None
+
+# Username reported to device server, can be overridden with MICROTVM_USER.
+_USER = os.environ.get("MICROTVM_USER") or getpass.getuser()
+
+# gRPC channels are expensive to create, keep one pool per server address per process.
+_CHANNEL_OPTIONS = GRPC_KEEPALIVE_OPTIONS
+CHANNEL_POOL_SIZE = 4
+# Seconds to wait for channel to become ready.
+_CHANNEL_READY_TIMEOUT = 5.0
+# (ip, port) -> ChannelPool
+_CHANNEL_CACHE = dict()
+# (ip, port) -> session number
+_SESSION_CACHE = dict()
+# device type -> (vid_hex, pid_hex), static per device table
+_TYPE_INFO_CACHE = dict()
+# (ip, port) of servers that device table was fetched from
+_DEVICE_TABLE_LOADED = set()
+
+# Deadline in seconds for each RPC.
+_RPC_TIMEOUT = 10.0
+# Number of attempts for a failed RPC.
+_RPC_ATTEMPTS = 3
+
+# Polling interval bounds in seconds while waiting for a device.
+POLL_BASE_SEC = 0.5
+POLL_CAP_SEC = 30.0
+
+
+def _import_grpc():
+    global grpc, microDevice_pb2, microDevice_pb2_grpc
+    if grpc is None:
+        import grpc
+        from . import microDevice_pb2
+        from . import microDevice_pb2_grpc
+
 
 def get_artifact_filename(device: str) -> str:
     return f"serial_{device}.micro"
 
 
+def _write_artifact(artifact_file: pathlib.Path, text: str):
+    """Atomically write text to artifact_file so readers never see a partial file."""
+    artifact_file.parent.mkdir(parents=True, exist_ok=True)
+    # NamedTemporaryFile creates files as 0600, keep the mode open() would have used.
+    umask = os.umask(0)
+    os.umask(umask)
+    f = tempfile.NamedTemporaryFile(
+        "w", dir=artifact_file.parent, prefix=f".{artifact_file.name}.", delete=False
+    )
+    try:
+        with f:
+            f.write(text)
+        os.chmod(f.name, 0o666 & ~umask)
+        os.replace(f.name, artifact_file)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def _backoff(attempt: int, base: float = POLL_BASE_SEC, cap: float = POLL_CAP_SEC) -> float:
+    """Return an exponential backoff delay with full jitter for this polling attempt."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def _wait_for_device(args: argparse.Namespace) -> MicroDevice:
+    """Poll device server with backoff until a device is assigned."""
+    LOG_.info(f"Waiting for {args.device} device...")
+    grpc_device = GRPCMicroDevice(args.ip, args.port, args.device)
+    attempt = 0
+    while True:
+        try:
+            if grpc_device.RequestDevice():
+                break
+        except grpc.RpcError as err:
+            if err.code() != grpc.StatusCode.DEADLINE_EXCEEDED:
+                raise
+            # Server may have assigned a device before the deadline, close the session to free
+            # it. A new session is requested on the next attempt.
+            LOG_.warning("Device request timed out, closing session before retrying.")
+            grpc_device.Close()
+        time.sleep(_backoff(attempt, args.poll_base, args.poll_cap))
+        attempt += 1
+    return grpc_device._device
+
+
+class ChannelPool:
+    """
+    A pool of up to size gRPC channels to one server.
+
+    Each thread is pinned to one channel and channels are only created when a new thread
+    needs one, so a single threaded client keeps a single connection. Each channel gets a
+    distinct channel argument so gRPC opens a separate TCP connection for it instead of
+    sharing one subchannel, which avoids HTTP/2 head-of-line blocking when many threads
+    have RPCs in flight.
+    """
+
+    def __init__(self, target: str, size: int = CHANNEL_POOL_SIZE):
+        self._target = target
+        self._size = size
+        self.channels = []
+        self.stubs = []
+        self._thread_index = threading.local()
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+    def _index(self) -> int:
+        """Returns index of the channel of this thread, creating the channel if needed."""
+        index = getattr(self._thread_index, "index", None)
+        if index is None:
+            with self._lock:
+                index = self._next_index % self._size
+                self._next_index += 1
+                if index == len(self.channels):
+                    channel = grpc.insecure_channel(
+                        self._target,
+                        options=_CHANNEL_OPTIONS + [("grpc.channel_number", index)],
+                    )
+                    self.channels.append(channel)
+                    self.stubs.append(microDevice_pb2_grpc.RPCRequestStub(channel))
+            self._thread_index.index = index
+        return index
+
+    def channel(self):
+        """Returns the channel that carries RPCs of this thread."""
+        return self.channels[self._index()]
+
+    def stub(self):
+        """Returns the stub that carries RPCs of this thread."""
+        return self.stubs[self._index()]
+
+    def close(self):
+        with self._lock:
+            for channel in self.channels:
+                channel.close()
+
+
 class GRPCMicroDevice:
     _device: MicroDevice = None
-    _rpc_stub = None
-    _rpc_channel = None
+    _pool: ChannelPool = None
     _session_number: str = None
 
     def __init__(self, ip: str, port: int, device_type: str):
-        self._rpc_channel = grpc.insecure_channel(f"{ip}:{port}")
-        self._rpc_stub = microDevice_pb2_grpc.RPCRequestStub(self._rpc_channel)
+        _import_grpc()
+        self._address = (ip, port)
+        self._pool = _CHANNEL_CACHE.get(self._address)
+        if self._pool is None:
+            self._pool = ChannelPool(f"{ip}:{port}")
+            _CHANNEL_CACHE[self._address] = self._pool
         self._device = MicroDevice(device_type=device_type, serial_number="")
-
-        # Request session number
-        response = self._rpc_stub.RPCSessionRequest(
-            microDevice_pb2.SessionMessage(session_number=None)
+        self._session_number = _SESSION_CACHE.get(self._address)
+
+    def _call(self, rpc_name: str, request, idempotent: bool = False):
+        """
+        Call an RPC with a deadline and retry it with backoff on transient failures.
+
+        Only idempotent RPCs are retried, on UNAVAILABLE and DEADLINE_EXCEEDED. Other RPCs may
+        have already run on server when they fail, e.g. if the connection resets mid-call, so
+        they wait for the channel to be ready instead and are sent once.
+        """
+        if not idempotent:
+            rpc = getattr(self._pool.stub(), rpc_name)
+            return rpc(request, timeout=_RPC_TIMEOUT, wait_for_ready=True)
+
+        retry_codes = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+        for attempt in range(_RPC_ATTEMPTS):
+            rpc = getattr(self._pool.stub(), rpc_name)
+            try:
+                return rpc(request, timeout=_RPC_TIMEOUT)
+            except grpc.RpcError as err:
+                if err.code() not in retry_codes or attempt == _RPC_ATTEMPTS - 1:
+                    raise
+                LOG_.debug(f"{rpc_name} failed with {err.code()}, retrying.")
+                time.sleep(_backoff(attempt))
+
+    def _ensure_session(self):
+        """Request a session number from server if this address has none yet."""
+        if self._session_number:
+            return
+        response = self._call(
+            "RPCSessionRequest", microDevice_pb2.SessionMessage(session_number=None)
         )
         self._session_number = response.session_number
-
-    def RequestDevice(self):
-        if not self._device.GetSerialNumber():
-            device_type = self._device.GetType()
-            response = self._rpc_stub.RPCDeviceRequest(
+        _SESSION_CACHE[self._address] = self._session_number
+
+    def RequestDevice(self) -> str:
+        """Request a device if none is assigned yet. Returns assigned serial number or empty."""
+        device = self._device
+        serial_number = device.serial_number
+        if not serial_number:
+            self._ensure_session()
+            device_type = device.type_
+            response = self._call(
+                "RPCDeviceRequest",
                 microDevice_pb2.DeviceMessage(
                     type=device_type,
                     session_number=self._session_number,
-                    user=getpass.getuser(),
-                )
+                    user=_USER,
+                ),
             )
-            if response.serial_number != "":
-                self._device.SetSerialNumber(response.serial_number)
-                self._device.SetVID(response.vid)
-                self._device.SetPID(response.pid)
+            serial_number = response.serial_number
+            if serial_number:
+                device.SetSerialNumber(serial_number)
+                vid_hex, pid_hex = response.vid.lower(), response.pid.lower()
+                device.SetVID(vid_hex)
+                device.SetPID(pid_hex)
+                _TYPE_INFO_CACHE.setdefault(device_type, (vid_hex, pid_hex))
+        return serial_number
 
     def ReleaseDevice(self) -> bool:
-        serial_number = self._device.GetSerialNumber()
+        serial_number = self._device.serial_number
         assert serial_number, "Serial number not valid."
-        device_type = self._device.GetType()
-        response = self._rpc_stub.RPCDeviceRelease(
-            microDevice_pb2.DeviceMessage(type=device_type, serial_number=serial_number)
+        device_type = self._device.type_
+        response = self._call(
+            "RPCDeviceRelease",
+            microDevice_pb2.DeviceMessage(type=device_type, serial_number=serial_number),
         )
         return response.success
 
+    def ServerIsAlive(self, timeout: float = _CHANNEL_READY_TIMEOUT) -> bool:
+        """Returns True if channel to device server is connected."""
+        try:
+            grpc.channel_ready_future(self._pool.channel()).result(timeout=timeout)
+        except grpc.FutureTimeoutError:
+            return False
+        return True
+
     def IsAlive(self) -> bool:
-        response = self._rpc_stub.RPCDeviceIsAlive(
+        """Returns True if device hardware is alive. Channel liveness is checked locally first."""
+        if not self.ServerIsAlive():
+            return False
+        response = self._call(
+            "RPCDeviceIsAlive",
             microDevice_pb2.DeviceMessage(
-                type=self._device.GetType(),
-                serial_number=self._device.GetSerialNumber(),
-            )
+                type=self._device.type_,
+                serial_number=self._device.serial_number,
+            ),
+            idempotent=True,
         )
         return response.is_alive
 
     def Close(self):
-        self._rpc_stub.RPCSessionClose(
-            microDevice_pb2.SessionMessage(
-                session_number=self._session_number,
-                task=GRPCSessionTasks.SESSION_CLOSE.value,
+        """Close session of this client, releasing its devices. Channels stay open for reuse."""
+        if self._session_number:
+            self._call(
+                "RPCSessionClose",
+                microDevice_pb2.SessionMessage(
+                    session_number=self._session_number,
+                    task=GRPCSessionTasks.SESSION_CLOSE.value,
+                ),
             )
-        )
-        self._rpc_channel.close()
-
-    def RequestList(self):
-        request = self._rpc_stub.RPCDeviceRequestList(microDevice_pb2.StringMessage())
-        return request.text
+            _SESSION_CACHE.pop(self._address, None)
+            self._session_number = None
+
+    def RequestList(self, device_type: str = None) -> str:
+        """Returns a table of devices on server, optionally only devices of device_type."""
+        try:
+            response = self._call(
+                "RPCDeviceRequestListStructured",
+                microDevice_pb2.DeviceMessage(type=device_type),
+                idempotent=True,
+            )
+        except grpc.RpcError as err:
+            # Older servers only provide the rendered table of all devices.
+            if err.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            if device_type:
+                LOG_.warning("Server does not support filtering by device type.")
+            response = self._call(
+                "RPCDeviceRequestList", microDevice_pb2.StringMessage(), idempotent=True
+            )
+            return response.text
+        platforms = MicroTVMPlatforms()
+        for device in response.devices:
+            micro_device = MicroDevice(
+                device_type=device.type,
+                serial_number=device.serial_number,
+                vid_hex=device.vid,
+                pid_hex=device.pid,
+            )
+            if device.in_use:
+                micro_device.SetUser(device.user)
+            micro_device.Enable(device.enabled)
+            platforms.AddPlatform(micro_device)
+        return str(platforms)
 
     def EnableDevice(self, serial_number: str, status: bool):
         if status:
-            request = self._rpc_stub.RPCDeviceRequestEnable(
-                microDevice_pb2.DeviceMessage(serial_number=serial_number)
+            request = self._call(
+                "RPCDeviceRequestEnable",
+                microDevice_pb2.DeviceMessage(serial_number=serial_number),
+                idempotent=True,
             )
         else:
-            request = self._rpc_stub.RPCDeviceRequestDisable(
-                microDevice_pb2.DeviceMessage(serial_number=serial_number)
+            request = self._call(
+                "RPCDeviceRequestDisable",
+                microDevice_pb2.DeviceMessage(serial_number=serial_number),
+                idempotent=True,
             )
         print(request.text)
 
+    def LoadDeviceTable(self):
+        """Fetch VID/PID of all device types from server once per server address."""
+        if self._address in _DEVICE_TABLE_LOADED:
+            return
+        try:
+            response = self._call(
+                "RPCGetDeviceTable", microDevice_pb2.StringMessage(), idempotent=True
+            )
+        except grpc.RpcError as err:
+            # Older servers only provide RPCGetDeviceTypeInfo.
+            if err.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+        else:
+            for type_info in response.devices:
+                _TYPE_INFO_CACHE.setdefault(
+                    type_info.type, (type_info.vid.lower(), type_info.pid.lower())
+                )
+        _DEVICE_TABLE_LOADED.add(self._address)
+
     def SetDeviceInfo(self):
-        request = self._rpc_stub.RPCGetDeviceTypeInfo(
-            microDevice_pb2.DeviceMessage(type=self._device.GetType())
+        device_type = self._device.type_
+        type_info = _TYPE_INFO_CACHE.get(device_type)
+        if type_info is None:
+            self.LoadDeviceTable()
+            type_info = _TYPE_INFO_CACHE.get(device_type)
+        if type_info is None:
+            request = self._call(
+                "RPCGetDeviceTypeInfo",
+                microDevice_pb2.DeviceMessage(type=device_type),
+                idempotent=True,
+            )
+            type_info = (request.vid.lower(), request.pid.lower())
+            _TYPE_INFO_CACHE[device_type] = type_info
+        self._device.SetVID(type_info[0])
+        self._device.SetPID(type_info[1])
+
+
+def close_channels():
+    """Close all cached channel pools. Clients created afterwards open new channels."""
+    while _CHANNEL_CACHE:
+        _, pool = _CHANNEL_CACHE.popitem()
+        pool.close()
+
+
+def load_type_info(table_file: pathlib.Path):
+    """Load VID/PID of device types from a local device table file."""
+    # vboxmanage output is matched in lower case.
+    for micro_device in device_utils.LoadDeviceTable(table_file).GetAllDeviceTypes():
+        _TYPE_INFO_CACHE.setdefault(
+            micro_device.type_, (micro_device.vid_hex.lower(), micro_device.pid_hex.lower())
         )
-        self._device.SetVID(request.vid)
-        self._device.SetPID(request.pid)
 
 
 def server_request_device(args: argparse.Namespace) -> MicroDevice:
@@ -137,29 +409,22 @@ def attach_device(args: argparse.Namespace):
     assert args.vm_path, "Error: Reference VM path missing."
 
     micro_device = server_request_device(args)
-    if not micro_device.GetSerialNumber():
+    if not micro_device.serial_number:
         if args.wait:
-            LOG_.info(f"Waiting for {args.device} device...")
-            while not micro_device.GetSerialNumber():
-                micro_device = server_request_device(args)
-                time.sleep(5)
+            micro_device = _wait_for_device(args)
         else:
             return
 
     try:
         device_utils.attach(micro_device, args.vm_path)
     except Exception as ex:
-        server_release_device(args.ip, args.port, args.device, micro_device.GetSerialNumber())
+        server_release_device(args.ip, args.port, args.device, micro_device.serial_number)
         raise RuntimeError(ex)
 
     if args.artifact_path:
         artifact_file = args.artifact_path / get_artifact_filename(args.device)
-        if artifact_file.is_file():
-            artifact_file.unlink()
-        args.artifact_path.mkdir(parents=True, exist_ok=True)
-        with open(artifact_file, "w") as f:
-            f.write(str(micro_device.GetSerialNumber()))
-    LOG_.info(f"Device {micro_device.GetSerialNumber()} attached.")
+        _write_artifact(artifact_file, str(micro_device.serial_number))
+    LOG_.info(f"Device {micro_device.serial_number} attached.")
 
 
 def detach_device(args: argparse.Namespace):
@@ -170,11 +435,13 @@ def detach_device(args: argparse.Namespace):
     artifact_file = None
     if args.artifact_path:
         artifact_file = args.artifact_path / get_artifact_filename(args.device)
-        with open(artifact_file, "r") as f:
-            serial_number = f.read()
+        serial_number = artifact_file.read_text().strip()
     else:
         serial_number = args.serial
 
+    if getattr(args, "table_file", None):
+        load_type_info(args.table_file)
+
     # make a MicroDevice with serial number, pid and vid
     grpc_micro_device = GRPCMicroDevice(args.ip, args.port, args.device)
     grpc_micro_device.SetDeviceInfo()
@@ -190,26 +457,19 @@ def detach_device(args: argparse.Namespace):
 
 def request_device(args: argparse.Namespace):
     micro_device = server_request_device(args)
-    if not micro_device.GetSerialNumber():
+    if not micro_device.serial_number:
         if args.wait:
-            LOG_.info(f"Waiting for {args.device} device...")
-            while not micro_device.GetSerialNumber():
-                micro_device = server_request_device(args)
-                time.sleep(5)
-    response_serial_number = micro_device.GetSerialNumber()
+            micro_device = _wait_for_device(args)
+    response_serial_number = micro_device.serial_number
 
     if args.artifact_path:
-        artifact_file = args.artifact_path
-        if artifact_file.is_file():
-            artifact_file.unlink()
-        with open(artifact_file, "w") as f:
-            f.write(str(response_serial_number))
+        _write_artifact(args.artifact_path, str(response_serial_number))
 
     if response_serial_number:
         print(response_serial_number)
     else:
         print(f"No device available.")
-    return micro_device.GetSerialNumber()
+    return micro_device.serial_number
 
 
 def release_device(args: argparse.Namespace):
@@ -223,7 +483,7 @@ def query_device(args: argparse.Namespace):
     elif hasattr(args, "disable") and args.disable:
         grpc_device.EnableDevice(serial_number=args.serial, status=False)
     else:
-        list = grpc_device.RequestList()
+        list = grpc_device.RequestList(device_type=getattr(args, "device", None))
         print(list)
         return list
 
@@ -235,19 +495,35 @@ def run_command(args):
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
 
-    device_arg = [
-        "--device",
-        {"type": str, "required": True, "help": "MicroTVM device to request."},
-    ]
-    serial_arg = ["--serial", {"type": str, "default": None, "help": "Device serial number."}]
-    vm_path_arg = [
-        "--vm-path",
-        {"type": pathlib.Path, "required": True, "help": "Path to Reference virtualbox."},
-    ]
-    artifact_path_arg = [
-        "--artifact-path",
-        {"type": pathlib.Path, "default": None, "help": "Path to store device artifact."},
-    ]
+    # Shared arguments, added to subcommands through argparse parents.
+    device_parser = argparse.ArgumentParser(add_help=False)
+    device_parser.add_argument(
+        "--device", type=str, required=True, help="MicroTVM device to request."
+    )
+    serial_parser = argparse.ArgumentParser(add_help=False)
+    serial_parser.add_argument("--serial", type=str, default=None, help="Device serial number.")
+    vm_path_parser = argparse.ArgumentParser(add_help=False)
+    vm_path_parser.add_argument(
+        "--vm-path", type=pathlib.Path, required=True, help="Path to Reference virtualbox."
+    )
+    artifact_path_parser = argparse.ArgumentParser(add_help=False)
+    artifact_path_parser.add_argument(
+        "--artifact-path", type=pathlib.Path, default=None, help="Path to store device artifact."
+    )
+    wait_parser = argparse.ArgumentParser(add_help=False)
+    wait_parser.add_argument("--wait", action="store_true", help="Wait if device not available.")
+    wait_parser.add_argument(
+        "--poll-base",
+        type=float,
+        default=POLL_BASE_SEC,
+        help="Initial polling interval in seconds when waiting for a device.",
+    )
+    wait_parser.add_argument(
+        "--poll-cap",
+        type=float,
+        default=POLL_CAP_SEC,
+        help="Maximum polling interval in seconds when waiting for a device.",
+    )
 
     subparsers = parser.add_subparsers(help="Action to perform.")
     parser.add_argument(
@@ -265,36 +541,42 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--log-level", default=None, help="Log level.")
 
     parser_attach = subparsers.add_parser(
-        "attach", help="Request a device and attach a virtual machine."
+        "attach",
+        help="Request a device and attach a virtual machine.",
+        parents=[device_parser, vm_path_parser, wait_parser, artifact_path_parser],
     )
     parser_attach.set_defaults(func=attach_device)
-    parser_attach.add_argument(device_arg[0], **device_arg[1])
-    parser_attach.add_argument(vm_path_arg[0], **vm_path_arg[1])
-    parser_attach.add_argument("--wait", action="store_true", help="Wait if device not available.")
-    parser_attach.add_argument(artifact_path_arg[0], **artifact_path_arg[1])
 
     parser_detach = subparsers.add_parser(
         "detach",
         help="Detach the device from virtual machine and release from device server.",
+        parents=[device_parser, vm_path_parser, artifact_path_parser, serial_parser],
     )
     parser_detach.set_defaults(func=detach_device)
-    parser_detach.add_argument(device_arg[0], **device_arg[1])
-    parser_detach.add_argument(vm_path_arg[0], **vm_path_arg[1])
-    parser_detach.add_argument(artifact_path_arg[0], **artifact_path_arg[1])
-    parser_detach.add_argument(serial_arg[0], **serial_arg[1])
+    parser_detach.add_argument(
+        "--table-file",
+        type=pathlib.Path,
+        default=None,
+        help="Device table Json file to look up VID/PID locally instead of asking server.",
+    )
 
-    parser_request = subparsers.add_parser("request", help="Request a device from device server.")
+    parser_request = subparsers.add_parser(
+        "request",
+        help="Request a device from device server.",
+        parents=[device_parser, artifact_path_parser, wait_parser],
+    )
     parser_request.set_defaults(func=request_device)
-    parser_request.add_argument(device_arg[0], **device_arg[1])
-    parser_request.add_argument(artifact_path_arg[0], **artifact_path_arg[1])
-    parser_request.add_argument("--wait", action="store_true", help="Wait if device not available.")
 
-    parser_release = subparsers.add_parser("release", help="Release a device from device server.")
+    parser_release = subparsers.add_parser(
+        "release",
+        help="Release a device from device server.",
+        parents=[device_parser, serial_parser],
+    )
     parser_release.set_defaults(func=release_device)
-    parser_release.add_argument(device_arg[0], **device_arg[1])
-    parser_release.add_argument(serial_arg[0], **serial_arg[1])
 
-    parser_query = subparsers.add_parser("query", help="Query devices from server.")
+    parser_query = subparsers.add_parser(
+        "query", help="Query devices from server.", parents=[serial_parser]
+    )
     parser_query.set_defaults(func=query_device)
     parser_query.add_argument(
         "--enable", action="store_true", default=None, help="Enable a device on server."
@@ -302,7 +584,9 @@ def parse_args() -> argparse.Namespace:
     parser_query.add_argument(
         "--disable", action="store_true", default=None, help="Disable a device on server."
     )
-    parser_query.add_argument(serial_arg[0], **serial_arg[1])
+    parser_query.add_argument(
+        "--device", type=str, default=None, help="Only list devices of this type."
+    )
 
     actions = []
     for name, item in subparsers.choices.items():
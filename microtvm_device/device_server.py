@@ -20,20 +20,36 @@ import logging
 import argparse
 import grpc
 import random
+import os
 
 from . import microDevice_pb2
 from . import microDevice_pb2_grpc
 from . import device_utils
 from .device_utils import MicroDevice, MicroTVMPlatforms
 from .device_utils import GRPCSessionTasks
-from .utils import SERVER_DEFAULT_IP
+from .utils import SERVER_DEFAULT_IP, GRPC_KEEPALIVE_OPTIONS, GRPC_KEEPALIVE_TIME_MS
 
 PLATFORMS = None
 SESSION_NUM_MAX_LEN = 10
+
+# Accept client keepalive pings, with margin for pings that arrive early due to timer jitter
+# so they are not counted as ping strikes.
+SERVER_KEEPALIVE_OPTIONS = GRPC_KEEPALIVE_OPTIONS + [
+    ("grpc.http2.min_ping_interval_without_data_ms", GRPC_KEEPALIVE_TIME_MS // 2),
+]
+SERVER_OPTIONS = SERVER_KEEPALIVE_OPTIONS + [("grpc.max_concurrent_streams", 1024)]
+SERVER_DEFAULT_WORKERS = min(64, (os.cpu_count() or 4) * 4)
 LOG_ = None
 
 LOG_ = logging.getLogger("MicroTVM Device Server")
 
+# (vid_hex, pid_hex) of device types in device table, only these are read from USB bus.
+TABLE_VID_PIDS = frozenset()
+
+
+# Reply sent when no device is available, shared since it is never modified.
+NO_DEVICE_REPLY = microDevice_pb2.DeviceReply(serial_number="")
+
 
 def LoadAttachedDevices(args: argparse.Namespace) -> MicroTVMPlatforms:
     """
@@ -41,27 +57,56 @@ def LoadAttachedDevices(args: argparse.Namespace) -> MicroTVMPlatforms:
 
     return: attached_devices
     """
+    global TABLE_VID_PIDS
     table: MicroTVMPlatforms = device_utils.LoadDeviceTable(args.table_file)
+    TABLE_VID_PIDS = frozenset(
+        (micro_device.vid_hex.lower(), micro_device.pid_hex.lower())
+        for micro_device in table.GetAllDeviceTypes()
+    )
 
     # Return a fake list of devices for testing
     if args.dry_run:
         return table
 
-    all_device_types = table.GetAllDeviceTypes()
     attached_devices = MicroTVMPlatforms()
 
-    for micro_device in all_device_types:
-        device_list = device_utils.ListConnectedDevices(micro_device)
-        for new_device in device_list:
-            # Update type based on Device Table since some device share the same (vid, pid).
-            new_device_type = table.GetType(new_device.GetSerialNumber())
+    for serial_number, vid_hex, pid_hex in device_utils.ListAllConnectedDevices(TABLE_VID_PIDS):
+        # Get type based on Device Table since some device share the same (vid, pid).
+        device_type = table.GetType(serial_number)
+        if device_type is None:
+            continue
+
+        attached_devices.AddPlatform(
+            MicroDevice(
+                device_type=device_type,
+                serial_number=serial_number,
+                vid_hex=vid_hex,
+                pid_hex=pid_hex,
+            )
+        )
+    return attached_devices
+
 
-            if new_device_type is None:
-                continue
+def DeviceIsAlive(device_type: str, serial: str) -> bool:
+    """
+    Returns True if a device of PLATFORMS is connected to the USB bus.
 
-            new_device.SetType(new_device_type)
-            attached_devices.AddPlatform(new_device)
-    return attached_devices
+    Serial numbers that are not in PLATFORMS are never probed. Requests share the USB bus
+    enumeration of ListAllConnectedDevices, so the answer is at most USB_ENUMERATION_TTL_SEC old.
+    """
+    if PLATFORMS.GetType(serial) is None:
+        return False
+    for serial_number, _, _ in device_utils.ListAllConnectedDevices(TABLE_VID_PIDS):
+        if serial_number == serial:
+            return True
+    return False
+
+
+def RequireFields(request, context, *fields):
+    """Abort RPC with INVALID_ARGUMENT if any of the request fields is empty."""
+    for field in fields:
+        if not getattr(request, field):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"{field} required.")
 
 
 def Initialize(args):
@@ -73,56 +118,51 @@ class RPCRequest(microDevice_pb2_grpc.RPCRequestServicer):
     global PLATFORMS
 
     def RPCDeviceRequest(self, request, context):
-        assert request.type
-        assert request.session_number
-        assert request.user
+        RequireFields(request, context, "type", "session_number", "user")
         micro_device = PLATFORMS.GetPlatform(request.type, request.session_number, request.user)
         if micro_device:
-            LOG_.debug(f"Platform {micro_device.GetSerialNumber()} assigned.")
-            LOG_.debug(PLATFORMS)
+            serial_number = micro_device.serial_number
+            LOG_.debug("Platform %s assigned.", serial_number)
+            LOG_.debug("%s", PLATFORMS)
             return microDevice_pb2.DeviceReply(
-                serial_number=micro_device.GetSerialNumber(),
-                vid=micro_device.GetVID(),
-                pid=micro_device.GetPID(),
+                serial_number=serial_number,
+                vid=micro_device.vid_hex,
+                pid=micro_device.pid_hex,
             )
         else:
-            return microDevice_pb2.DeviceReply(serial_number="")
+            return NO_DEVICE_REPLY
 
     def RPCDeviceRelease(self, request, context):
-        assert request.type
-        assert request.serial_number
+        RequireFields(request, context, "type", "serial_number")
         status = PLATFORMS.ReleasePlatform(serial_number=request.serial_number)
-        LOG_.debug(PLATFORMS)
+        LOG_.debug("%s", PLATFORMS)
         return microDevice_pb2.DeviceReply(success=status)
 
     def RPCDeviceIsAlive(self, request, context):
-        assert request.type
+        RequireFields(request, context, "type", "serial_number")
 
         return microDevice_pb2.DeviceReply(
             serial_number=request.serial_number,
-            is_alive=device_utils.DeviceIsAlive(
-                platform=request.type, serial=request.serial_number
-            ),
+            is_alive=DeviceIsAlive(device_type=request.type, serial=request.serial_number),
         )
 
     def RPCSessionRequest(self, request, context):
-        sess_num = "".join(
-            ["{}".format(random.randint(0, 9)) for num in range(0, SESSION_NUM_MAX_LEN)]
-        )
         # Add a new session
-        PLATFORMS._sessions[sess_num] = []
+        while True:
+            sess_num = f"{random.randrange(10**SESSION_NUM_MAX_LEN):0{SESSION_NUM_MAX_LEN}d}"
+            if PLATFORMS.AddSession(sess_num):
+                break
         return microDevice_pb2.SessionMessage(session_number=sess_num)
 
     def RPCSessionClose(self, request, context):
-        metadict = dict(context.invocation_metadata())
-        print(metadict)
+        if LOG_.isEnabledFor(logging.DEBUG):
+            LOG_.debug("close metadata=%s", dict(context.invocation_metadata()))
 
-        assert request.session_number
+        RequireFields(request, context, "session_number")
 
-        logging.debug(f"Closing session {{{request.session_number}}}.")
-        for serial_num in PLATFORMS._sessions[request.session_number]:
-            PLATFORMS.ReleasePlatform(serial_num)
-            logging.debug(f"Platform {serial_num} released.")
+        LOG_.debug("Closing session {%s}.", request.session_number)
+        serial_numbers = PLATFORMS.CloseSession(request.session_number)
+        LOG_.debug("Platforms %s released.", serial_numbers)
         return microDevice_pb2.SessionMessage(
             session_number=request.session_number,
             task=GRPCSessionTasks.SESSION_CLOSED.value,
@@ -131,9 +171,23 @@ class RPCRequest(microDevice_pb2_grpc.RPCRequestServicer):
     def RPCDeviceRequestList(self, request, context):
         return microDevice_pb2.StringMessage(text=str(PLATFORMS))
 
+    def RPCDeviceRequestListStructured(self, request, context):
+        device_list = microDevice_pb2.DeviceList()
+        for platform in PLATFORMS.Snapshot(device_type=request.type):
+            device_list.devices.add(
+                serial_number=platform.serial_number,
+                vid=platform.vid_hex,
+                pid=platform.pid_hex,
+                type=platform.type_,
+                in_use=platform.is_taken,
+                user=platform.user,
+                enabled=platform.enabled,
+            )
+        return device_list
+
     def RPCDeviceRequestEnable(self, request, context):
         status = PLATFORMS.EnablePlatform(serial_number=request.serial_number, status=True)
-        LOG_.debug(PLATFORMS)
+        LOG_.debug("%s", PLATFORMS)
         if status:
             return microDevice_pb2.StringMessage(text="Enable Success.")
         else:
@@ -141,28 +195,43 @@ class RPCRequest(microDevice_pb2_grpc.RPCRequestServicer):
 
     def RPCDeviceRequestDisable(self, request, context):
         status = PLATFORMS.EnablePlatform(serial_number=request.serial_number, status=False)
-        LOG_.debug(PLATFORMS)
+        LOG_.debug("%s", PLATFORMS)
         if status:
             return microDevice_pb2.StringMessage(text="Disable Success.")
         else:
             return microDevice_pb2.StringMessage(text="Disable failed.")
 
     def RPCGetDeviceTypeInfo(self, request, context):
-        assert request.type
+        RequireFields(request, context, "type")
         micro_device = PLATFORMS.GetDeviceWithType(device_type=request.type)
-        return microDevice_pb2.DeviceReply(vid=micro_device.GetVID(), pid=micro_device.GetPID())
+        if micro_device is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Device type {request.type} not found.")
+        return microDevice_pb2.DeviceReply(vid=micro_device.vid_hex, pid=micro_device.pid_hex)
+
+    def RPCGetDeviceTable(self, request, context):
+        device_table = microDevice_pb2.DeviceTable()
+        for micro_device in PLATFORMS.GetAllDeviceTypes():
+            device_table.devices.add(
+                type=micro_device.type_, vid=micro_device.vid_hex, pid=micro_device.pid_hex
+            )
+        return device_table
 
 
 def ServerStart(args):
     """Start server"""
     global PLATFORMS
     PLATFORMS = Initialize(args)
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    workers = getattr(args, "workers", None) or SERVER_DEFAULT_WORKERS
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=workers),
+        options=SERVER_OPTIONS,
+        maximum_concurrent_rpcs=getattr(args, "max_concurrent_rpcs", None),
+    )
     microDevice_pb2_grpc.add_RPCRequestServicer_to_server(RPCRequest(), server)
     server.add_insecure_port(f"{args.ip}:{args.port}")
     server.start()
     LOG_.info("Server started...!")
-    LOG_.info(PLATFORMS)
+    LOG_.info("%s", PLATFORMS)
     server.wait_for_termination()
 
 
@@ -181,6 +250,18 @@ def parse_args() -> argparse.Namespace:
         help="RPC server ip",
     )
     parser.add_argument("--port", type=int, default=6566, help="RPC port number.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SERVER_DEFAULT_WORKERS,
+        help="Number of worker threads to handle RPC requests.",
+    )
+    parser.add_argument(
+        "--max-concurrent-rpcs",
+        type=int,
+        default=None,
+        help="Reject RPCs with RESOURCE_EXHAUSTED beyond this many in flight. Unbounded by default.",
+    )
     parser.add_argument("--log-level", default=None, help="Log level.")
     parser.add_argument("--dry-run", default=False, action="store_true")
 
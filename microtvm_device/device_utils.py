@@ -21,97 +21,145 @@ import re
 import os
 import enum
 import json
-from tabulate import tabulate
 import logging
-import copy
 import random
+import threading
+import time
+import collections
+import functools
+import shutil
+import itertools
 import grp
 import getpass
+import sys
 import usb.core
 import usb.util
 
-VIRTUALBOX_VID_PID_RE = re.compile(r"0x([0-9A-Fa-f]{4}).*")
+# Matches vboxmanage VendorId/ProductId such as "0x0483 (0483)" and captures the hex value.
+VIRTUALBOX_VID_PID_RE = re.compile(r"0x[0-9A-Fa-f]+\s*\(([0-9A-Fa-f]+)\)")
 
 logging.basicConfig(level=logging.INFO)
 LOG_ = logging.getLogger("Device Utils")
 
+# Sessions without devices are dropped after this many idle seconds.
+SESSION_IDLE_TTL_SEC = 10 * 60
+# Minimum seconds between idle session sweeps.
+SESSION_REAP_INTERVAL_SEC = 60
+
+# Device table files of this size in bytes or larger are parsed incrementally.
+DEVICE_TABLE_STREAMING_MIN_SIZE = 64 * 1024
+
+# Seconds to reuse a USB bus enumeration.
+USB_ENUMERATION_TTL_SEC = 2.0
+# (timestamp, vid_pids filter, list of (serial, vid_hex, pid_hex))
+_USB_ENUMERATION_CACHE = (None, None, None)
+# One bus enumeration in flight, concurrent callers wait for its result.
+_USB_ENUMERATION_LOCK = threading.Lock()
+
+
+def _Intern(value: str) -> str:
+    """Intern repeated strings such as device type, VID and PID. None is returned as is."""
+    return sys.intern(value) if value else value
+
 
 class MicroDevice(object):
     """A microTVM device instance."""
 
+    __slots__ = (
+        "type_",
+        "serial_number",
+        "vid_hex",
+        "pid_hex",
+        "is_taken",
+        "user",
+        "enabled",
+    )
+
     def __init__(
         self, device_type: str, serial_number: str, vid_hex: str = None, pid_hex: str = None
     ) -> None:
         """
         Parameters
         ----------
-        _type : str
+        type_ : str
             Device type.
-        _serial_number : str
+        serial_number : str
             Device serial number.
-        _vid_hex : str
+        vid_hex : str
             VID number.
-        _pid_hex : str
+        pid_hex : str
             PID number.
-        _is_taken : bool
+        is_taken : bool
             If device is aquired.
-        _user : str
+        user : str
             Username who aquired this device.
-        _enabled : bool
+        enabled : bool
             True if device is enabled to use.
         """
-        self._type: str = device_type
-        self._serial_number: str = serial_number
-        self._vid_hex: str = vid_hex
-        self._pid_hex: str = pid_hex
-        self._is_taken: bool = False
-        self._user: str = None
-        self._enabled: bool = True
+        self.type_: str = _Intern(device_type)
+        self.serial_number: str = serial_number
+        self.vid_hex: str = _Intern(vid_hex)
+        self.pid_hex: str = _Intern(pid_hex)
+        self.is_taken: bool = False
+        self.user: str = None
+        self.enabled: bool = True
         super().__init__()
 
     def __str__(self) -> str:
-        return f"MicroDevice=>\tType:{self.GetType()}\tSerial:{self.GetSerialNumber()}\tPID:{self.GetPID()}\tVID:{self.GetVID()}"
+        return f"MicroDevice=>\tType:{self.type_}\tSerial:{self.serial_number}\tPID:{self.pid_hex}\tVID:{self.vid_hex}"
+
+    def clone(self) -> "MicroDevice":
+        """Returns a copy of this device without going through the copy module."""
+        device = MicroDevice.__new__(MicroDevice)
+        device.type_ = self.type_
+        device.serial_number = self.serial_number
+        device.vid_hex = self.vid_hex
+        device.pid_hex = self.pid_hex
+        device.is_taken = self.is_taken
+        device.user = self.user
+        device.enabled = self.enabled
+        return device
 
     def GetSerialNumber(self) -> str:
-        return self._serial_number
+        return self.serial_number
 
     def GetType(self) -> str:
-        return self._type
+        return self.type_
 
     def GetVID(self) -> str:
-        return self._vid_hex
+        return self.vid_hex
 
     def GetPID(self) -> str:
-        return self._pid_hex
+        return self.pid_hex
 
     def SetType(self, type: str):
-        self._type = type
+        self.type_ = _Intern(type)
 
     def SetSerialNumber(self, serial_number: str):
-        self._serial_number = serial_number
+        self.serial_number = serial_number
 
     def SetVID(self, vid: str):
-        self._vid_hex = vid
+        self.vid_hex = _Intern(vid)
 
     def SetPID(self, pid: str):
-        self._pid_hex = pid
+        self.pid_hex = _Intern(pid)
 
     def SetTaken(self):
-        self._is_taken = True
+        self.is_taken = True
 
     def SetUser(self, user=None):
         if not user:
-            self._user = "Unknown"
+            self.user = "Unknown"
         else:
-            self._user = user
+            self.user = user
         self.SetTaken()
 
     def Enable(self, status: str):
-        self._enabled = status
+        self.enabled = status
 
     def Free(self):
-        self._is_taken = False
-        self._user = None
+        self.is_taken = False
+        self.user = None
 
 
 class GRPCSessionTasks(str, enum.Enum):
@@ -128,96 +176,198 @@ class MicroTVMPlatforms:
         ----------
         _platforms : list[MicroDevice]
             List of MicroDevices.
-        _serial_numbers : set[str]
-            Set of serial numbers of all MicroDevices.
-        _sessions : dict[str]
-            A dictionary that keeps MicroDevices for each connected session.
+        _sessions : dict[str, list[str]]
+            A dictionary that keeps MicroDevice serial numbers for each connected session.
+        _session_activity : dict[str, float]
+            Last time each session was opened, acquired or released a device.
+        _session_by_serial : dict[str, str]
+            Session that holds each taken MicroDevice serial number.
+        _last_session_reap : float
+            Last time idle sessions were swept.
+        _by_serial : dict[str, MicroDevice]
+            Index of MicroDevices by serial number.
+        _by_type : dict[str, list[MicroDevice]]
+            Index of MicroDevices by device type.
+        _free_by_type : dict[str, set[MicroDevice]]
+            Index of MicroDevices that are not taken by device type.
+        _lock : threading.Lock
+            Lock to protect index updates from concurrent RPC handlers.
+        _version : int
+            Counter bumped whenever a platform is added or changes state.
+        _str_cache : tuple[str, int]
+            Rendered platform table and the _version it was rendered at.
         """
         self._platforms = list()
-        self._serial_numbers = set()
-        self._sessions = dict()
+        self._sessions = collections.defaultdict(list)
+        self._session_activity = dict()
+        self._session_by_serial = dict()
+        self._last_session_reap = time.monotonic()
+        self._by_serial = dict()
+        self._by_type = dict()
+        self._free_by_type = dict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._str_cache = (None, -1)
 
     def __str__(self):
+        message, version = self._str_cache
+        if version == self._version:
+            return message
+        version = self._version
+        # Imported here since only table rendering needs it.
+        from tabulate import tabulate
+
         headers = ["#", "Type", "Serial", "Available", "User", "Enabled"]
-        data = []
-        for device in self._platforms:
-            data.append(
-                [
-                    device.GetType(),
-                    device.GetSerialNumber(),
-                    not device._is_taken,
-                    str(device._user),
-                    device._enabled,
-                ]
-            )
-        data = sorted(data, key=lambda l: l[0].lower(), reverse=False)
-        message = "\n"
-        message += str(tabulate(data, headers=headers, showindex="always"))
+        data = [
+            [
+                device.type_,
+                device.serial_number,
+                not device.is_taken,
+                str(device.user),
+                device.enabled,
+            ]
+            for device in sorted(self._platforms, key=lambda device: device.type_.lower())
+        ]
+        message = "\n" + str(tabulate(data, headers=headers, showindex="always"))
+        self._str_cache = (message, version)
         return message
 
     def AddPlatform(self, device: MicroDevice):
-        if device.GetSerialNumber() not in self._serial_numbers:
-            self._serial_numbers.add(device.GetSerialNumber())
-            self._platforms.append(device)
+        with self._lock:
+            if device.serial_number not in self._by_serial:
+                self._platforms.append(device)
+                self._by_serial[device.serial_number] = device
+                self._version += 1
+                self._by_type.setdefault(device.type_, []).append(device)
+                free = self._free_by_type.setdefault(device.type_, set())
+                if not device.is_taken:
+                    free.add(device)
+
+    def AddSession(self, session_number: str) -> bool:
+        """Add a new session. Returns false if session already exists."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_session_reap > SESSION_REAP_INTERVAL_SEC:
+                self._ReapSessions(now)
+            if session_number in self._sessions:
+                return False
+            self._sessions[session_number] = []
+            self._session_activity[session_number] = now
+            return True
+
+    def CloseSession(self, session_number: str) -> list:
+        """Remove a session, release its devices and return their serial numbers."""
+        with self._lock:
+            self._session_activity.pop(session_number, None)
+            serial_numbers = self._sessions.pop(session_number, [])
+            for serial_number in serial_numbers:
+                self._mark_free(self._by_serial[serial_number])
+            return serial_numbers
+
+    def _ReapSessions(self, now: float):
+        """Drop sessions that hold no device and were idle for SESSION_IDLE_TTL_SEC."""
+        for session_number, last_activity in list(self._session_activity.items()):
+            if now - last_activity > SESSION_IDLE_TTL_SEC and not self._sessions[session_number]:
+                del self._sessions[session_number]
+                del self._session_activity[session_number]
+        self._last_session_reap = now
 
     def GetType(self, serial_number: str) -> str:
         """Returns device type if serial number exist in platforms, otherwise None."""
-        for platform in self._platforms:
-            if platform._serial_number == serial_number:
-                return platform._type
-        return None
+        platform = self._by_serial.get(serial_number)
+        return platform.type_ if platform else None
 
     def GetPlatform(self, type: str, session_number: str, username: str) -> str:
         """Gets a MicroDevice from platform list."""
-        candidate_platforms = []
-        for platform in self._platforms:
-            if platform._type == type and not platform._is_taken and platform._enabled:
-                candidate_platforms.append(platform)
-
-        if len(candidate_platforms) > 0:
-            random_num = random.randint(0, len(candidate_platforms) - 1)
-            platform = candidate_platforms[random_num]
-            platform._is_taken = True
-            platform._user = username
-            serial_number = platform.GetSerialNumber()
-            self._sessions[session_number].append(serial_number)
-            return copy.copy(platform)
+        with self._lock:
+            free_platforms = self._free_by_type.get(type)
+            if not free_platforms:
+                return None
+            candidate_platforms = [platform for platform in free_platforms if platform.enabled]
+
+            if candidate_platforms:
+                platform = random.choice(candidate_platforms)
+                self._mark_taken(platform, username)
+                serial_number = platform.serial_number
+                self._sessions[session_number].append(serial_number)
+                self._session_by_serial[serial_number] = session_number
+                self._session_activity[session_number] = time.monotonic()
+                return platform.clone()
         return None
 
+    def _mark_taken(self, platform: MicroDevice, username: str):
+        """Mark platform as taken by username and remove it from free index. Needs _lock."""
+        self._free_by_type[platform.type_].discard(platform)
+        platform.SetUser(username)
+        self._version += 1
+
+    def _mark_free(self, platform: MicroDevice):
+        """Free platform, add it back to free index and remove it from its session. Needs _lock."""
+        platform.Free()
+        session_number = self._session_by_serial.pop(platform.serial_number, None)
+        session_serials = self._sessions.get(session_number)
+        if session_serials is not None:
+            session_serials.remove(platform.serial_number)
+            self._session_activity[session_number] = time.monotonic()
+        self._free_by_type[platform.type_].add(platform)
+        self._version += 1
+
     def ReleasePlatform(self, serial_number: str) -> bool:
         """
         Release a device.
 
         Returns false if device serial was not found.
         """
-        for platform in self._platforms:
-            if platform.GetSerialNumber() == serial_number:
-                platform.Free()
-                return True
-        LOG_.warning(f"SerialNumber {serial_number} was not found.")
-        return False
+        return self.ReleasePlatforms([serial_number])
+
+    def ReleasePlatforms(self, serial_numbers: list) -> bool:
+        """
+        Release a list of devices while holding the lock once.
+
+        Returns false if any device serial was not found.
+        """
+        not_found = []
+        with self._lock:
+            for serial_number in serial_numbers:
+                platform = self._by_serial.get(serial_number)
+                if platform:
+                    self._mark_free(platform)
+                else:
+                    not_found.append(serial_number)
+        for serial_number in not_found:
+            LOG_.warning(f"SerialNumber {serial_number} was not found.")
+        return not not_found
 
     def EnablePlatform(self, serial_number: str, status: bool) -> bool:
-        for platform in self._platforms:
-            if platform.GetSerialNumber() == serial_number:
+        with self._lock:
+            platform = self._by_serial.get(serial_number)
+            if platform:
                 platform.Enable(status)
+                self._version += 1
                 return True
         return False
 
     def GetAllDeviceTypes(self) -> list:
-        micro_device_list = list()
-        all_types = set()
+        """Returns the first platform of each (type, VID, PID) in insertion order."""
+        micro_devices = dict()
         for platform in self._platforms:
-            platform_code = f"{platform.GetType()},{platform.GetPID()},{platform.GetVID()}"
-            if platform_code not in all_types:
-                all_types.add(platform_code)
-                micro_device_list.append(platform)
-        return micro_device_list
+            key = (platform.type_, platform.vid_hex, platform.pid_hex)
+            micro_devices.setdefault(key, platform)
+        return list(micro_devices.values())
+
+    def Snapshot(self, device_type: str = None) -> list:
+        """Returns copies of all platforms, or only platforms of device_type, taken under lock."""
+        with self._lock:
+            if device_type:
+                platforms = self._by_type.get(device_type, [])
+            else:
+                platforms = self._platforms
+            return [platform.clone() for platform in platforms]
 
     def GetDeviceWithType(self, device_type: str) -> MicroDevice:
-        for platform in self._platforms:
-            if platform.GetType() == device_type:
-                return copy.copy(platform)
+        platforms = self._by_type.get(device_type)
+        if platforms:
+            return platforms[0].clone()
         return None
 
 
@@ -229,12 +379,41 @@ def _check_call(cmd, **kwargs) -> None:
         raise Exception(error_msg)
 
 
+def _stream_output(cmd: list):
+    """Run a command and yield its stdout line by line without buffering all of it."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, encoding="utf-8")
+    try:
+        for line in proc.stdout:
+            yield line.rstrip("\n")
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def _IterDeviceTable(json_f):
+    """
+    Iterate (device_type, config) pairs of a device table file.
+
+    Large tables are parsed incrementally with ijson if it is installed, otherwise the whole
+    file is loaded with json.
+    """
+    if os.fstat(json_f.fileno()).st_size >= DEVICE_TABLE_STREAMING_MIN_SIZE:
+        try:
+            import ijson
+        except ImportError:
+            LOG_.debug("ijson not installed, loading device table with json.")
+        else:
+            return ijson.kvitems(json_f, "")
+    return json.load(json_f).items()
+
+
 def LoadDeviceTable(table_file: str) -> MicroTVMPlatforms:
     """Load device table Json file to MicroTVMPlatforms."""
-    with open(table_file, "r") as json_f:
-        data = json.load(json_f)
+    with open(table_file, "rb") as json_f:
         device_table = MicroTVMPlatforms()
-        for device_type, config in data.items():
+        for device_type, config in _IterDeviceTable(json_f):
             for (serial, vid, pid) in config["instances"]:
                 new_device = MicroDevice(
                     device_type=device_type,
@@ -248,158 +427,158 @@ def LoadDeviceTable(table_file: str) -> MicroTVMPlatforms:
 
 def GetUsersFromGroup(group_name: str) -> list:
     """Return all users in a group on linux"""
-    all_users = []
-    groups = grp.getgrall()
-    for group in groups:
-        if group.gr_name == group_name:
-            for user in group[3]:
-                all_users.append(user)
-    return all_users
+    try:
+        return list(grp.getgrnam(group_name).gr_mem)
+    except KeyError:
+        return []
 
 
-def ParseUSBDevices(micro_device: MicroDevice):
-    """Parse devices with usb.core and return a list of devices match micro_device."""
-    pid = int(micro_device.GetPID(), base=16)
-    vid = int(micro_device.GetVID(), base=16)
+@functools.lru_cache(maxsize=None)
+def _GetVBoxUsers() -> tuple:
+    """Users in vboxusers group, looked up once per process."""
+    return tuple(GetUsersFromGroup("vboxusers"))
 
-    devices = []
-    all_devices = usb.core.find(find_all=1, idVendor=vid, idProduct=pid)
-    if all_devices:
-        for device in all_devices:
-            try:
-                current_dev = {
-                    "vid_hex": micro_device.GetVID(),
-                    "pid_hex": micro_device.GetVID(),
-                    "SerialNumber": device.serial_number,
-                }
-            except ValueError as ex:
-                print(ex)
-                continue
-            devices.append(current_dev)
-    else:
-        raise RuntimeError(f"Did not find any device with {micro_device}.")
 
-    return devices
+@functools.lru_cache(maxsize=None)
+def _GetVBoxManageCmd() -> str:
+    """Path to vboxmanage, looked up once per process."""
+    vboxmanage_cmd = shutil.which("vboxmanage")
+    if not vboxmanage_cmd:
+        raise RuntimeError("vboxmanage was not found in PATH.")
+    return vboxmanage_cmd
 
 
-def ParseVirtualBoxDevices(micro_device: MicroDevice, username: str = None) -> list:
-    """Parse usb devices and return a list of devices maching microtvm_platform.
-    This function returns one device per serial number and user.
+def ListAllConnectedDevices(vid_pids: frozenset = None) -> list:
     """
-    vboxmanage_cmd = subprocess.check_output(["which", "vboxmanage"], encoding="utf-8").replace("\n", "")
-    if username:
-        vboxusers = [username]
+    Enumerate USB bus once and return a list of (serial_number, vid_hex, pid_hex).
+
+    If vid_pids is set, devices with a (vid_hex, pid_hex) not in it are skipped before their
+    serial number descriptor is read.
+    Result is cached for USB_ENUMERATION_TTL_SEC seconds.
+    """
+    with _USB_ENUMERATION_LOCK:
+        return _ListAllConnectedDevices(vid_pids)
+
+
+def _ListAllConnectedDevices(vid_pids: frozenset) -> list:
+    """Enumerate USB bus unless the cached result is fresh. Needs _USB_ENUMERATION_LOCK."""
+    global _USB_ENUMERATION_CACHE
+    timestamp, cached_vid_pids, devices = _USB_ENUMERATION_CACHE
+    now = time.monotonic()
+    if (
+        timestamp is not None
+        and cached_vid_pids == vid_pids
+        and now - timestamp < USB_ENUMERATION_TTL_SEC
+    ):
+        return devices
+
+    if vid_pids is None:
+        bus_devices = usb.core.find(find_all=True)
     else:
-        vboxusers = GetUsersFromGroup("vboxusers")
+        bus_devices = usb.core.find(
+            find_all=True,
+            custom_match=lambda device: (f"{device.idVendor:04x}", f"{device.idProduct:04x}")
+            in vid_pids,
+        )
     devices = []
-    for user in vboxusers:
-        output = subprocess.check_output(
-            ["sudo", "-H", "-u", user, vboxmanage_cmd, "list", "usbhost"], encoding="utf-8"
+    for device in bus_devices:
+        try:
+            serial_number = device.serial_number
+        except (ValueError, usb.core.USBError) as ex:
+            LOG_.debug(ex)
+            continue
+        if not serial_number:
+            continue
+        devices.append(
+            (
+                serial_number,
+                _Intern(f"{device.idVendor:04x}"),
+                _Intern(f"{device.idProduct:04x}"),
+            )
         )
-        if "Host USB Devices:\n\n<none>\n\n" in output:
+    _USB_ENUMERATION_CACHE = (now, vid_pids, devices)
+    return devices
+
+
+def _ParseVirtualBoxUserDevices(
+    micro_device: MicroDevice, user: str, vboxmanage_cmd: str, target_serial: str = None
+) -> list:
+    """
+    Parse `vboxmanage list usbhost` as user and return devices matching micro_device.
+
+    If target_serial is set, stop at the first matching device with that serial number.
+    """
+    devices = []
+    current_dev = {}
+    target_vid_pid = (micro_device.vid_hex, micro_device.pid_hex)
+    lines = _stream_output(["sudo", "-H", "-u", user, vboxmanage_cmd, "list", "usbhost"])
+    # A trailing empty line completes the last device when output has none.
+    for line in itertools.chain(lines, [""]):
+        if line.strip() == "<none>":
             logging.warning(f"User `{user}` cannot access USB information.")
-            continue
+            current_dev = {}
+            break
 
-        current_dev = {}
-        for line in output.split("\n"):
-            if not line.strip():
-                if current_dev:
-                    if "VendorId" in current_dev and "ProductId" in current_dev:
-                        # Update VendorId and ProductId to hex
-                        m = VIRTUALBOX_VID_PID_RE.match(current_dev["VendorId"])
-                        if not m:
-                            LOG_.warning("Malformed VendorId: %s", current_dev["VendorId"])
-                            current_dev = {}
-                            continue
-
-                        m = VIRTUALBOX_VID_PID_RE.match(current_dev["ProductId"])
-                        if not m:
-                            LOG_.warning("Malformed ProductId: %s", current_dev["ProductId"])
-                            current_dev = {}
-                            continue
-
-                        current_dev["vid_hex"] = (
-                            current_dev["VendorId"]
-                            .replace("(", "")
-                            .replace(")", "")
-                            .split(" ")[1]
-                            .lower()
-                        )
-                        current_dev.pop("VendorId", None)
-
-                        current_dev["pid_hex"] = (
-                            current_dev["ProductId"]
-                            .replace("(", "")
-                            .replace(")", "")
-                            .split(" ")[1]
-                            .lower()
-                        )
-                        current_dev.pop("ProductId", None)
-
-                        if (
-                            current_dev["vid_hex"] == micro_device.GetVID()
-                            and current_dev["pid_hex"] == micro_device.GetPID()
-                        ):
+        if not line.strip():
+            if current_dev:
+                if "VendorId" in current_dev and "ProductId" in current_dev:
+                    # Update VendorId and ProductId to hex
+                    vid_match = VIRTUALBOX_VID_PID_RE.match(current_dev["VendorId"])
+                    if not vid_match:
+                        LOG_.warning("Malformed VendorId: %s", current_dev["VendorId"])
+                        current_dev = {}
+                        continue
+
+                    pid_match = VIRTUALBOX_VID_PID_RE.match(current_dev["ProductId"])
+                    if not pid_match:
+                        LOG_.warning("Malformed ProductId: %s", current_dev["ProductId"])
+                        current_dev = {}
+                        continue
+
+                    current_dev["vid_hex"] = _Intern(vid_match.group(1).lower())
+                    current_dev.pop("VendorId", None)
+                    current_dev["pid_hex"] = _Intern(pid_match.group(1).lower())
+                    current_dev.pop("ProductId", None)
+
+                    if (current_dev["vid_hex"], current_dev["pid_hex"]) == target_vid_pid:
+                        if target_serial is None:
                             devices.append(current_dev)
-                    current_dev = {}
-                # Line empty and a device is not created
-                continue
+                        elif current_dev.get("SerialNumber") == target_serial:
+                            return [current_dev]
+                current_dev = {}
+            # Line empty and a device is not created
+            continue
 
-            key, value = line.split(":", 1)
-            value = value.lstrip(" ")
-            current_dev[key] = value
+        key, value = line.split(":", 1)
+        value = value.lstrip(" ")
+        current_dev[key] = value
 
-        if current_dev:
-            devices.append(current_dev)
     return devices
 
 
-def ListConnectedDevices(micro_device: MicroDevice) -> list:
-    """List all platforms connected to this hardware node. Returns a list of MicroDevice."""
-    # Commented this to skip virtual box.
-    # devices = ParseVirtualBoxDevices(micro_device)
-    devices = ParseUSBDevices(micro_device)
-    device_list = []
-    for device in devices:
-        new_device = MicroDevice(
-            device_type=micro_device.GetType(),
-            serial_number=device["SerialNumber"],
-            vid_hex=micro_device.GetVID(),
-            pid_hex=micro_device.GetPID(),
+def ParseVirtualBoxDevices(
+    micro_device: MicroDevice, username: str = None, target_serial: str = None
+) -> list:
+    """Parse usb devices and return a list of devices maching microtvm_platform.
+    This function returns one device per serial number and user.
+    If target_serial is set, only devices with that serial number are returned.
+    """
+    vboxmanage_cmd = _GetVBoxManageCmd()
+    if username:
+        vboxusers = [username]
+    else:
+        vboxusers = _GetVBoxUsers()
+    devices = []
+    for user in vboxusers:
+        devices.extend(
+            _ParseVirtualBoxUserDevices(micro_device, user, vboxmanage_cmd, target_serial)
         )
-        # if device["Current State"] == "Captured":
-        #     new_device.SetUser()
-        device_list.append(new_device)
-
-    # Remove repetition in devices
-    refined_list = []
-    serial_list = []
-    for device_1 in device_list:
-        if device_1.GetSerialNumber() in serial_list:
-            continue
-        temp_devices = [device_1]
-        serial_list.append(device_1.GetSerialNumber())
-
-        for device_2 in device_list:
-            if device_1.GetSerialNumber() == device_2.GetSerialNumber():
-                temp_devices.append(device_2)
-
-        device_added = False
-        for device in temp_devices:
-            if device._is_taken:
-                refined_list.append(device)
-                device_added = True
-                continue
-        if not device_added:
-            refined_list.append(device)
-
-    return refined_list
+    return devices
 
 
 def DeviceIsAlive(device_type: str, serial: str) -> bool:
-    devices = ListConnectedDevices(MicroDevice(device_type, serial_number=serial))
-    for device in devices:
-        if device.GetSerialNumber() == serial:
+    for serial_number, _, _ in ListAllConnectedDevices():
+        if serial_number == serial:
             return True
     return False
 
@@ -408,23 +587,21 @@ def VirtualBoxGetInfo(machine_uuid: str) -> dict:
     """
     Get virtual box information and return as a dictionary.
     """
-    output = subprocess.check_output(["vboxmanage", "showvminfo", machine_uuid], encoding="utf-8")
     machine_info = {}
-    for line in output.split("\n"):
+    for line in _stream_output(["vboxmanage", "showvminfo", machine_uuid]):
         LOG_.debug(line)
-        try:
-            key, value = line.split(":", 1)
-            value = value.lstrip(" ")
-            # To capture multiple microTVM devices
-            if key in machine_info:
-                if machine_info[key] is list:
-                    machine_info[key].append(value)
-                else:
-                    machine_info[key] = [machine_info[key], value]
-            else:
-                machine_info[key] = value
-        except:
+        key, sep, value = line.partition(":")
+        if not sep:
             continue
+        value = value.lstrip(" ")
+        # To capture multiple microTVM devices
+        current = machine_info.get(key)
+        if current is None:
+            machine_info[key] = value
+        elif isinstance(current, list):
+            current.append(value)
+        else:
+            machine_info[key] = [current, value]
     LOG_.debug(f"machine info:\n{machine_info}")
     return machine_info
 
@@ -439,6 +616,22 @@ def virtualbox_is_live(machine_uuid: str):
     return False
 
 
+def _VagrantIdFile(vm_path: str) -> str:
+    return os.path.join(vm_path, ".vagrant", "machines", "default", "virtualbox", "id")
+
+
+@functools.lru_cache(maxsize=32)
+def _ReadVagrantUUID(vm_path: str, mtime_ns: int) -> str:
+    """Read the machine UUID of a vagrant VM. mtime_ns is only part of the cache key."""
+    with open(_VagrantIdFile(vm_path)) as f:
+        return f.read()
+
+
+def _GetVagrantMachineUUID(vm_path: str) -> str:
+    """Returns the machine UUID of a vagrant VM, read again only when its id file changes."""
+    return _ReadVagrantUUID(vm_path, os.stat(_VagrantIdFile(vm_path)).st_mtime_ns)
+
+
 def attach_command(args):
     attach(MicroDevice(device_type=args.microtvm_platform, serial_number=args.serial), args.vm_path)
 
@@ -447,23 +640,19 @@ def attach(micro_device: MicroDevice, vm_path: str):
     """
     Attach a microTVM platform to a virtualbox.
     """
-    usb_devices = ParseVirtualBoxDevices(micro_device, username=getpass.getuser())
-    found = False
-    for dev in usb_devices:
-        if dev["SerialNumber"] == micro_device.GetSerialNumber():
-            vid_hex = dev["vid_hex"]
-            pid_hex = dev["pid_hex"]
-            serial = dev["SerialNumber"]
-            dev_uuid = dev["UUID"]
-            found = True
-            break
+    usb_devices = ParseVirtualBoxDevices(
+        micro_device, username=getpass.getuser(), target_serial=micro_device.serial_number
+    )
+    if not usb_devices:
+        raise ValueError(f"Device S/N {micro_device.serial_number} not found.")
 
-    if not found:
-        LOG_.warning(f"Device list:\n{usb_devices}")
-        raise ValueError(f"Device S/N {micro_device.GetSerialNumber()} not found.")
+    dev = usb_devices[0]
+    vid_hex = dev["vid_hex"]
+    pid_hex = dev["pid_hex"]
+    serial = dev["SerialNumber"]
+    dev_uuid = dev["UUID"]
 
-    with open(os.path.join(vm_path, ".vagrant", "machines", "default", "virtualbox", "id")) as f:
-        machine_uuid = f.read()
+    machine_uuid = _GetVagrantMachineUUID(vm_path)
 
     if serial and dev_uuid:
         rule_args = [
@@ -487,10 +676,14 @@ def attach(micro_device: MicroDevice, vm_path: str):
 
         # Check if already attached
         machine_info = VirtualBoxGetInfo(machine_uuid)
-        if "SerialNumber" in machine_info:
-            if serial in machine_info["SerialNumber"]:
-                LOG_.info(f"Device {serial} already attached.")
-                return
+        attached_serials = machine_info.get("SerialNumber")
+        if isinstance(attached_serials, list):
+            attached_serials = set(attached_serials)
+        else:
+            attached_serials = {attached_serials} if attached_serials else set()
+        if serial in attached_serials:
+            LOG_.info(f"Device {serial} already attached.")
+            return
 
         # if virtualbox_is_live(machine_uuid):
         #     raise RuntimeError("VM is running.")
@@ -505,21 +698,15 @@ def attach(micro_device: MicroDevice, vm_path: str):
 
 
 def detach(micro_device: MicroDevice, vm_path: str):
-    with open(os.path.join(vm_path, ".vagrant", "machines", "default", "virtualbox", "id")) as f:
-        machine_uuid = f.read()
-
-    usb_devices = ParseVirtualBoxDevices(micro_device, username=getpass.getuser())
-    found = False
-    for dev in usb_devices:
-        if dev["SerialNumber"] == micro_device.GetSerialNumber():
-            dev_uuid = dev["UUID"]
-            found = True
-            break
+    machine_uuid = _GetVagrantMachineUUID(vm_path)
 
-    if not found:
-        LOG_.warning(f"Serial {micro_device.GetSerialNumber()} not found in usb devies.")
-        LOG_.warning(usb_devices)
+    usb_devices = ParseVirtualBoxDevices(
+        micro_device, username=getpass.getuser(), target_serial=micro_device.serial_number
+    )
+    if not usb_devices:
+        LOG_.warning(f"Serial {micro_device.serial_number} not found in usb devies.")
         return
+    dev_uuid = usb_devices[0]["UUID"]
     _check_call(["VBoxManage", "controlvm", machine_uuid, "usbdetach", dev_uuid])
 
 
@@ -60,6 +60,16 @@ class RPCRequestStub(object):
                 request_serializer=microtvm__device_dot_microDevice__pb2.DeviceMessage.SerializeToString,
                 response_deserializer=microtvm__device_dot_microDevice__pb2.DeviceReply.FromString,
                 )
+        self.RPCGetDeviceTable = channel.unary_unary(
+                '/microDevice.RPCRequest/RPCGetDeviceTable',
+                request_serializer=microtvm__device_dot_microDevice__pb2.StringMessage.SerializeToString,
+                response_deserializer=microtvm__device_dot_microDevice__pb2.DeviceTable.FromString,
+                )
+        self.RPCDeviceRequestListStructured = channel.unary_unary(
+                '/microDevice.RPCRequest/RPCDeviceRequestListStructured',
+                request_serializer=microtvm__device_dot_microDevice__pb2.DeviceMessage.SerializeToString,
+                response_deserializer=microtvm__device_dot_microDevice__pb2.DeviceList.FromString,
+                )
 
 
 class RPCRequestServicer(object):
@@ -121,6 +131,18 @@ class RPCRequestServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def RPCGetDeviceTable(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RPCDeviceRequestListStructured(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RPCRequestServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -169,6 +191,16 @@ def add_RPCRequestServicer_to_server(servicer, server):
                     request_deserializer=microtvm__device_dot_microDevice__pb2.DeviceMessage.FromString,
                     response_serializer=microtvm__device_dot_microDevice__pb2.DeviceReply.SerializeToString,
             ),
+            'RPCGetDeviceTable': grpc.unary_unary_rpc_method_handler(
+                    servicer.RPCGetDeviceTable,
+                    request_deserializer=microtvm__device_dot_microDevice__pb2.StringMessage.FromString,
+                    response_serializer=microtvm__device_dot_microDevice__pb2.DeviceTable.SerializeToString,
+            ),
+            'RPCDeviceRequestListStructured': grpc.unary_unary_rpc_method_handler(
+                    servicer.RPCDeviceRequestListStructured,
+                    request_deserializer=microtvm__device_dot_microDevice__pb2.DeviceMessage.FromString,
+                    response_serializer=microtvm__device_dot_microDevice__pb2.DeviceList.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'microDevice.RPCRequest', rpc_method_handlers)
@@ -332,3 +364,37 @@ class RPCRequest(object):
             microtvm__device_dot_microDevice__pb2.DeviceReply.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def RPCGetDeviceTable(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/microDevice.RPCRequest/RPCGetDeviceTable',
+            microtvm__device_dot_microDevice__pb2.StringMessage.SerializeToString,
+            microtvm__device_dot_microDevice__pb2.DeviceTable.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def RPCDeviceRequestListStructured(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/microDevice.RPCRequest/RPCDeviceRequestListStructured',
+            microtvm__device_dot_microDevice__pb2.DeviceMessage.SerializeToString,
+            microtvm__device_dot_microDevice__pb2.DeviceList.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
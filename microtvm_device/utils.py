@@ -16,3 +16,13 @@
 # under the License.
 
 SERVER_DEFAULT_IP = "127.0.0.1"
+
+# HTTP/2 keepalive so channel state reflects real connectivity to peer.
+GRPC_KEEPALIVE_TIME_MS = 20000
+GRPC_KEEPALIVE_TIMEOUT_MS = 5000
+GRPC_KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
+    ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
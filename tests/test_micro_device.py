@@ -16,6 +16,7 @@
 # under the License.
 
 import sys
+import time
 from time import sleep
 import pytest
 import argparse
@@ -25,6 +26,7 @@ import multiprocessing
 
 from microtvm_device import device_server
 from microtvm_device import device_client
+from microtvm_device import device_utils
 
 SERVER_PORT = 4040
 
@@ -62,5 +64,206 @@ def test_query():
     server_proc.terminate()
 
 
+def test_backoff():
+    for attempt in range(10):
+        delay = device_client._backoff(attempt, base=0.5, cap=30.0)
+        assert 0 <= delay <= min(30.0, 0.5 * (2**attempt))
+
+
+def test_platforms_get_release():
+    platforms = device_utils.MicroTVMPlatforms()
+    platforms.AddPlatform(device_utils.MicroDevice("nucleo_l4r5zi", "serial_1", "0483", "374b"))
+    platforms.AddPlatform(device_utils.MicroDevice("nucleo_l4r5zi", "serial_2", "0483", "374b"))
+    platforms._sessions["1234"] = []
+
+    serials = set()
+    for _ in range(2):
+        device = platforms.GetPlatform("nucleo_l4r5zi", "1234", "user")
+        serials.add(device.GetSerialNumber())
+    assert serials == {"serial_1", "serial_2"}
+    assert platforms.GetPlatform("nucleo_l4r5zi", "1234", "user") is None
+
+    assert platforms.ReleasePlatform("serial_1")
+    assert not platforms.ReleasePlatform("serial_3")
+    assert platforms.GetPlatform("nucleo_l4r5zi", "1234", "user").GetSerialNumber() == "serial_1"
+
+
+def test_platforms_reap_sessions():
+    platforms = device_utils.MicroTVMPlatforms()
+    platforms.AddPlatform(device_utils.MicroDevice("nucleo_l4r5zi", "serial_1", "0483", "374b"))
+    assert platforms.AddSession("1111")
+    assert platforms.AddSession("2222")
+    assert not platforms.AddSession("1111")
+    platforms.GetPlatform("nucleo_l4r5zi", "2222", "user")
+
+    platforms._ReapSessions(time.monotonic() + device_utils.SESSION_IDLE_TTL_SEC + 1)
+    assert "1111" not in platforms._sessions
+    assert platforms.CloseSession("2222") == ["serial_1"]
+    assert not platforms._by_serial["serial_1"].is_taken
+
+
+def test_platforms_release_leaves_session():
+    platforms = device_utils.MicroTVMPlatforms()
+    platforms.AddPlatform(device_utils.MicroDevice("nucleo_l4r5zi", "serial_1", "0483", "374b"))
+    assert platforms.AddSession("1111")
+    assert platforms.AddSession("2222")
+    platforms.GetPlatform("nucleo_l4r5zi", "1111", "user")
+    assert platforms.ReleasePlatform("serial_1")
+    assert platforms._sessions["1111"] == []
+
+    # Closing the stale session must not free the device held by another session.
+    platforms.GetPlatform("nucleo_l4r5zi", "2222", "user")
+    assert platforms.CloseSession("1111") == []
+    assert platforms._by_serial["serial_1"].is_taken
+
+    platforms._ReapSessions(time.monotonic() + device_utils.SESSION_IDLE_TTL_SEC + 1)
+    assert "2222" in platforms._sessions
+
+
+class FakeUSBDevice:
+    def __init__(self, vid, pid, serial_number):
+        self.idVendor = vid
+        self.idProduct = pid
+        self._serial_number = serial_number
+        self.serial_reads = 0
+
+    @property
+    def serial_number(self):
+        self.serial_reads += 1
+        if isinstance(self._serial_number, Exception):
+            raise self._serial_number
+        return self._serial_number
+
+
+def test_list_all_connected_devices(monkeypatch):
+    hub = FakeUSBDevice(0x1D6B, 0x0002, "hub")
+    bus = [
+        hub,
+        FakeUSBDevice(0x0483, 0x374B, device_utils.usb.core.USBError("Pipe error")),
+        FakeUSBDevice(0x0483, 0x374B, "serial_1"),
+    ]
+
+    def find(find_all, custom_match=None):
+        return [device for device in bus if custom_match is None or custom_match(device)]
+
+    monkeypatch.setattr(device_utils.usb.core, "find", find)
+    monkeypatch.setattr(device_utils, "_USB_ENUMERATION_CACHE", (None, None, None))
+    devices = device_utils.ListAllConnectedDevices(frozenset([("0483", "374b")]))
+    assert devices == [("serial_1", "0483", "374b")]
+    assert hub.serial_reads == 0
+
+
+VBOX_USBHOST_OUTPUT = """Host USB Devices:
+
+UUID:               aaaa-1
+VendorId:           0x0483 (0483)
+ProductId:          0x374B (374B)
+SerialNumber:       s1
+Current State:      Busy
+
+UUID:               aaaa-2
+VendorId:           bogus
+ProductId:          0x374B (374B)
+SerialNumber:       s2
+
+UUID:               aaaa-3
+VendorId:           0x1366 (1366)
+ProductId:          0x1051 (1051)
+SerialNumber:       n1
+
+UUID:               aaaa-4
+VendorId:           0x0483 (0483)
+ProductId:          0x374b (374b)
+SerialNumber:       s3"""
+
+VBOX_SHOWVMINFO_OUTPUT = """Name:            vm
+SerialNumber:    s10
+SerialNumber:    n1
+SerialNumber:    s3
+no colon here"""
+
+
+def fake_stream_output(outputs):
+    def stream_output(cmd):
+        for name, output in outputs.items():
+            if name in cmd:
+                return iter(output.splitlines())
+        raise AssertionError(f"unexpected command {cmd}")
+
+    return stream_output
+
+
+def test_virtualbox_get_info(monkeypatch):
+    monkeypatch.setattr(
+        device_utils,
+        "_stream_output",
+        fake_stream_output({"showvminfo": VBOX_SHOWVMINFO_OUTPUT}),
+    )
+    machine_info = device_utils.VirtualBoxGetInfo("uuid")
+    assert machine_info["Name"] == "vm"
+    assert machine_info["SerialNumber"] == ["s10", "n1", "s3"]
+    assert "no colon here" not in machine_info
+
+
+def test_parse_virtualbox_user_devices(monkeypatch):
+    monkeypatch.setattr(
+        device_utils, "_stream_output", fake_stream_output({"usbhost": VBOX_USBHOST_OUTPUT})
+    )
+    micro_device = device_utils.MicroDevice("nucleo_l4r5zi", "", "0483", "374b")
+    devices = device_utils._ParseVirtualBoxUserDevices(micro_device, "user", "vboxmanage")
+    assert [device["SerialNumber"] for device in devices] == ["s1", "s3"]
+    assert devices[0]["vid_hex"] == "0483" and devices[0]["pid_hex"] == "374b"
+
+    devices = device_utils._ParseVirtualBoxUserDevices(
+        micro_device, "user", "vboxmanage", target_serial="s3"
+    )
+    assert [device["UUID"] for device in devices] == ["aaaa-4"]
+
+    monkeypatch.setattr(device_utils, "_stream_output", fake_stream_output({"usbhost": "<none>"}))
+    assert device_utils._ParseVirtualBoxUserDevices(micro_device, "user", "vboxmanage") == []
+
+
+def test_parse_virtualbox_devices_users(monkeypatch):
+    users = []
+
+    def stream_output(cmd):
+        users.append(cmd[3])
+        return iter(VBOX_USBHOST_OUTPUT.splitlines())
+
+    monkeypatch.setattr(device_utils, "_GetVBoxManageCmd", lambda: "vboxmanage")
+    monkeypatch.setattr(device_utils, "_GetVBoxUsers", lambda: ("user_1", "user_2"))
+    monkeypatch.setattr(device_utils, "_stream_output", stream_output)
+    micro_device = device_utils.MicroDevice("nucleo_l4r5zi", "", "0483", "374b")
+    devices = device_utils.ParseVirtualBoxDevices(micro_device)
+    assert users == ["user_1", "user_2"]
+    assert [device["SerialNumber"] for device in devices] == ["s1", "s3", "s1", "s3"]
+
+
+def test_attach_exact_serial(monkeypatch, tmp_path):
+    id_file = tmp_path / ".vagrant" / "machines" / "default" / "virtualbox" / "id"
+    id_file.parent.mkdir(parents=True)
+    id_file.write_text("machine-uuid")
+    monkeypatch.setattr(device_utils, "_GetVBoxManageCmd", lambda: "vboxmanage")
+    monkeypatch.setattr(
+        device_utils,
+        "_stream_output",
+        fake_stream_output({"usbhost": VBOX_USBHOST_OUTPUT, "showvminfo": "SerialNumber: s10"}),
+    )
+    check_calls = []
+    monkeypatch.setattr(device_utils, "_check_call", lambda cmd, **kwargs: check_calls.append(cmd))
+
+    # s10 being attached must not count as s1.
+    device_utils.attach(device_utils.MicroDevice("nucleo_l4r5zi", "s1", "0483", "374b"), tmp_path)
+    assert check_calls == [["VBoxManage", "controlvm", "machine-uuid", "usbattach", "aaaa-1"]]
+
+    monkeypatch.setattr(
+        device_utils,
+        "_stream_output",
+        fake_stream_output({"usbhost": VBOX_USBHOST_OUTPUT, "showvminfo": VBOX_SHOWVMINFO_OUTPUT}),
+    )
+    device_utils.attach(device_utils.MicroDevice("nucleo_l4r5zi", "s3", "0483", "374b"), tmp_path)
+    assert len(check_calls) == 1
+
+
 if __name__ == "__main__":
     sys.exit(pytest.main([__file__] + sys.argv[1:]))